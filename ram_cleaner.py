@@ -12,96 +12,264 @@ Supports:
 Usage:
     python ram_cleaner.py --threshold 60 --check-interval 10 --after-clean 60
     python ram_cleaner.py --once --threshold 50   # run single check & clean (for testing)
+    python ram_cleaner.py --stats-port 8765       # also serve clean-event stats as JSON
 """
 
 import argparse
+import json
 import logging
 import platform
+import queue
+import random
+import re
+import stat
+import threading
 import time
 import psutil
 import sys
-import subprocess
 import os
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-# Windows-specific imports attempted lazily (only import/use when on Windows)
-try:
-    import ctypes
-    from ctypes import wintypes
-except Exception:
-    ctypes = None
+# Platform-specific imports stay off the cold path: ctypes (Windows-only) is
+# imported and its DLL handles/prototypes bound here once, and subprocess
+# (macOS-only, for sudo/purge) is imported inside the macOS cleaner. On
+# Linux neither module is ever loaded.
+ctypes = None
+_kernel32 = _psapi = None
+_EmptyWorkingSet = _SetProcessWorkingSetSize = None
+_hProc = None
+if os.name == 'nt':
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        # LoadLibrary and argtypes/restype assignment are not free and
+        # clean_memory_windows() runs on every threshold breach.
+        _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        _psapi = ctypes.WinDLL('psapi', use_last_error=True)
+
+        _kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        _EmptyWorkingSet = _psapi.EmptyWorkingSet
+        _EmptyWorkingSet.argtypes = [wintypes.HANDLE]
+        _EmptyWorkingSet.restype = wintypes.BOOL
+        _SetProcessWorkingSetSize = _kernel32.SetProcessWorkingSetSize
+        _SetProcessWorkingSetSize.argtypes = [wintypes.HANDLE, ctypes.c_size_t, ctypes.c_size_t]
+        _SetProcessWorkingSetSize.restype = wintypes.BOOL
+        _hProc = _kernel32.GetCurrentProcess()
+    except Exception:
+        _kernel32 = _psapi = None
 
 # ----------------------------- Config/Defaults -----------------------------
 DEFAULT_THRESHOLD = 60
 DEFAULT_CHECK_INTERVAL = 10
 DEFAULT_AFTER_CLEAN = 60
 DEFAULT_LOGFILE = "ram_cleaner.log"
+# Adaptive wait: seconds of sleep granted per percentage point of headroom
+# below the threshold (capped at --check-interval).
+ADAPTIVE_SLEEP_PER_PCT = 2
+# PSI trigger: wake when tasks stall on memory for 150ms within a 1s window.
+PSI_TRIGGER = b"some 150000 1000000\0"
+# Clean guard: weight of the newest sample in the rolling usage baseline,
+# the freed fraction of total RAM below which a cleanup counts as
+# ineffective, and the backoff cap (multiple of --after-clean).
+BASELINE_EWMA_ALPHA = 0.2
+MIN_EFFECTIVE_FREED_FRAC = 0.01
+MAX_COOLDOWN_FACTOR = 8
+# Status logging: log the periodic status line when usage moved by at least
+# this many percentage points, or at most once per minute otherwise.
+LOG_PCT_DELTA = 2
+# Directories whose page-cache pages the Linux soft cleaner evicts before
+# we escalate to the drop_caches sledgehammer.
+SOFT_CLEAN_DIRS = ("/var/log", "/var/cache/apt/archives")
+# Clean-event history kept in memory, regardless of uptime.
+CLEAN_HISTORY_CAP = 500
 
 # ----------------------------- OS helpers ---------------------------------
-def is_root():
-    """Return True if running as root/administrator"""
+def _compute_is_root():
+    """Determine root/administrator status (computed once at import)."""
     if os.name == 'nt':
-        # On Windows, check for admin using shell call
+        if ctypes is None:
+            return False
+        # Query the process token for elevation directly; cheaper and more
+        # accurate than shell32's IsUserAnAdmin.
         try:
-            import ctypes
-            return ctypes.windll.shell32.IsUserAnAdmin() != 0
+            advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+            # Prototype the calls like the kernel32/psapi bindings above;
+            # without argtypes the GetCurrentProcess pseudo-handle would go
+            # through ctypes' default C-int conversion and only survive by
+            # truncation + sign-extension.
+            advapi32.OpenProcessToken.argtypes = [wintypes.HANDLE, wintypes.DWORD,
+                                                  ctypes.POINTER(wintypes.HANDLE)]
+            advapi32.OpenProcessToken.restype = wintypes.BOOL
+            advapi32.GetTokenInformation.argtypes = [wintypes.HANDLE, ctypes.c_int,
+                                                     ctypes.c_void_p, wintypes.DWORD,
+                                                     ctypes.POINTER(wintypes.DWORD)]
+            advapi32.GetTokenInformation.restype = wintypes.BOOL
+            _kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+            _kernel32.CloseHandle.restype = wintypes.BOOL
+            TOKEN_QUERY = 0x0008
+            TokenElevation = 20
+            token = wintypes.HANDLE()
+            if not advapi32.OpenProcessToken(_kernel32.GetCurrentProcess(),
+                                             TOKEN_QUERY, ctypes.byref(token)):
+                return False
+            try:
+                elevation = wintypes.DWORD()
+                ret_len = wintypes.DWORD()
+                ok = advapi32.GetTokenInformation(token, TokenElevation,
+                                                 ctypes.byref(elevation),
+                                                 ctypes.sizeof(elevation),
+                                                 ctypes.byref(ret_len))
+                return bool(ok) and elevation.value != 0
+            finally:
+                _kernel32.CloseHandle(token)
         except Exception:
             return False
     else:
         return os.geteuid() == 0
 
+_IS_ROOT = _compute_is_root()
+
+def is_root():
+    """Return True if running as root/administrator (cached at import)."""
+    return _IS_ROOT
+
 # ----------------------------- Cleaning functions --------------------------
 def clean_memory_windows(logger):
     """Trim the working set for *this* process. Requires kernel32 & psapi."""
-    if ctypes is None:
-        logger.error("ctypes not available — cannot run Windows-specific code.")
+    if _kernel32 is None:
+        logger.error("ctypes/Windows DLLs not available — cannot run Windows-specific code.")
         return False
 
     try:
-        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
-        psapi = ctypes.WinDLL('psapi', use_last_error=True)
-
-        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
-        psapi.EmptyWorkingSet.argtypes = [wintypes.HANDLE]
-        psapi.EmptyWorkingSet.restype = wintypes.BOOL
-        kernel32.SetProcessWorkingSetSize.argtypes = [wintypes.HANDLE, ctypes.c_size_t, ctypes.c_size_t]
-        kernel32.SetProcessWorkingSetSize.restype = wintypes.BOOL
-
-        hProc = kernel32.GetCurrentProcess()
-        ok1 = bool(psapi.EmptyWorkingSet(hProc))
-        ok2 = bool(kernel32.SetProcessWorkingSetSize(hProc,
-                                                    ctypes.c_size_t(-1),
-                                                    ctypes.c_size_t(-1)))
+        # DLL handles, prototypes and the process handle are bound once at
+        # module import; this is just the two API calls.
+        ok1 = bool(_EmptyWorkingSet(_hProc))
+        ok2 = bool(_SetProcessWorkingSetSize(_hProc,
+                                             ctypes.c_size_t(-1),
+                                             ctypes.c_size_t(-1)))
         logger.info(f"Windows clean: EmptyWorkingSet={ok1} SetProcessWorkingSetSize={ok2}")
         return ok1 or ok2
     except Exception as e:
         logger.exception("Windows memory-clean failed")
         return False
 
+def clean_memory_linux_soft(logger, dirs=SOFT_CLEAN_DIRS):
+    """
+    Evict page-cache pages of known cache-heavy directories via
+    posix_fadvise(POSIX_FADV_DONTNEED). Unlike drop_caches this leaves the
+    rest of the page cache intact, so hot files elsewhere are not forced
+    into a re-fault storm, and it works on files we can merely read.
+    """
+    advised = 0
+    for top in dirs:
+        for dirpath, _dirnames, filenames in os.walk(top):
+            for name in filenames:
+                try:
+                    # O_NONBLOCK so a FIFO in a log directory can't block the
+                    # open forever (and with it the whole cleaner worker).
+                    fd = os.open(os.path.join(dirpath, name),
+                                 os.O_RDONLY | os.O_NONBLOCK)
+                except OSError:
+                    continue
+                try:
+                    if not stat.S_ISREG(os.fstat(fd).st_mode):
+                        continue  # only regular files hold page cache
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                    advised += 1
+                except OSError:
+                    pass
+                finally:
+                    os.close(fd)
+    logger.info(f"Linux soft clean: advised DONTNEED on {advised} files")
+    return advised > 0
+
 def clean_memory_linux(logger):
+    """
+    Tiered Linux cleaning: try the per-file posix_fadvise pass first and
+    only fall back to the global drop_caches write when it freed less than
+    MIN_EFFECTIVE_FREED_FRAC of total RAM.
+    """
+    vm_before = _snapshot()
+    clean_memory_linux_soft(logger)
+    vm_after = _snapshot()
+    # Cache eviction shows up as free pages, not as a drop in 'used'
+    # (psutil already counts cache as available).
+    freed = max(0, vm_after.free - vm_before.free)
+    if freed >= _TOTAL * MIN_EFFECTIVE_FREED_FRAC:
+        logger.info(f"Linux clean: soft pass freed {freed} bytes; skipping drop_caches")
+        return True
+    return _drop_caches(logger)
+
+_drop_caches_fd = None
+
+def _drop_caches(logger):
     """
     Clear caches on Linux by writing to /proc/sys/vm/drop_caches.
     WARNING: This requires root privileges. Use with care.
     """
+    global _drop_caches_fd
     try:
-        # Ensure sync first
-        subprocess.run(["/bin/sync"], check=True)
-        # Need to echo to file as root. Using shell for the echo operation.
-        cmd = "echo 3 > /proc/sys/vm/drop_caches"
-        subprocess.run(cmd, shell=True, check=True, executable="/bin/bash")
+        # Flush dirty pages first, then write directly to the sysctl file.
+        # The fd is opened once and kept, so each cleanup is exactly two
+        # syscalls (sync + pwrite) instead of sync + open + write + close.
+        os.sync()
+        if _drop_caches_fd is None:
+            _drop_caches_fd = os.open("/proc/sys/vm/drop_caches", os.O_WRONLY)
+        os.pwrite(_drop_caches_fd, b"3\n", 0)
         logger.info("Linux clean: wrote '3' to /proc/sys/vm/drop_caches")
         return True
-    except subprocess.CalledProcessError as e:
+    except PermissionError:
         logger.exception("Linux drop_caches failed (requires root)")
         return False
     except Exception:
         logger.exception("Linux memory-clean failed")
         return False
 
+_mac_helper = None
+
+def _mac_purge_helper():
+    """
+    Spawn (once) a long-lived privileged helper that runs 'purge' on demand.
+    sudo validates credentials a single time at spawn; afterwards each clean
+    is just a pipe write + read instead of a full sudo fork+exec.
+    Returns the helper process, or None if it could not be started
+    (e.g. 'sudo -n' refused because no cached credentials exist).
+    """
+    global _mac_helper
+    import subprocess
+    if _mac_helper is not None and _mac_helper.poll() is None:
+        return _mac_helper
+    try:
+        _mac_helper = subprocess.Popen(
+            ["/usr/bin/sudo", "-n", "sh", "-c",
+             "while read line; do purge; echo done; done"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    except Exception:
+        _mac_helper = None
+    return _mac_helper
+
 def clean_memory_mac(logger):
     """
     macOS memory cleaning via 'purge' command.
     May require installation of developer tools or privileges.
     """
+    global _mac_helper
+    import subprocess
+    helper = _mac_purge_helper()
+    if helper is not None:
+        try:
+            helper.stdin.write(b"go\n")
+            helper.stdin.flush()
+            if helper.stdout.readline().strip() == b"done":
+                logger.info("macOS clean: executed 'purge' via helper")
+                return True
+        except Exception:
+            pass
+        # Helper died (credentials expired, purge missing, ...); drop it and
+        # fall back to a one-shot sudo below.
+        _mac_helper = None
     try:
         # purge is a built-in tool on many macOS versions; requires sudo
         subprocess.run(["/usr/bin/sudo", "purge"], check=True)
@@ -114,14 +282,244 @@ def clean_memory_mac(logger):
         logger.exception("macOS memory-clean failed")
         return False
 
+# Platform dispatch resolved once at import; platform.system() never changes
+# and its first call can be surprisingly costly on some platforms.
+_SYSTEM = platform.system()
+CLEANER = {"Windows": clean_memory_windows,
+           "Linux": clean_memory_linux,
+           "Darwin": clean_memory_mac}.get(_SYSTEM)
+
+# ----------------------------- Clean-event history --------------------------
+_clean_samples = []      # reservoir of (timestamp, freed_bytes) tuples
+_clean_seen = 0
+
+def record_clean_event(ts, freed_bytes):
+    """
+    Reservoir-sample clean events (Algorithm R) so a long-running daemon
+    keeps a uniform sample of its history in O(CLEAN_HISTORY_CAP) memory
+    instead of growing without bound.
+    """
+    global _clean_seen
+    _clean_seen += 1
+    if len(_clean_samples) < CLEAN_HISTORY_CAP:
+        _clean_samples.append((ts, freed_bytes))
+    elif random.random() < CLEAN_HISTORY_CAP / _clean_seen:
+        _clean_samples[random.randrange(CLEAN_HISTORY_CAP)] = (ts, freed_bytes)
+
+def _start_stats_server(port, logger):
+    """
+    Serve the sampled clean history as JSON on http://127.0.0.1:<port>/.
+    Runs on a daemon thread; returns the server.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StatsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps({"events_seen": _clean_seen,
+                               "samples": sorted(_clean_samples)}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass  # keep HTTP chatter out of the RAM log
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StatsHandler)
+    threading.Thread(target=server.serve_forever, name="stats", daemon=True).start()
+    logger.info(f"Stats endpoint listening on http://127.0.0.1:{port}/")
+    return server
+
+# ----------------------------- Idle wait -----------------------------------
+def _open_psi_watcher():
+    """
+    Best-effort registration of a PSI trigger on /proc/pressure/memory (Linux).
+    Returns an (epoll, fd) pair on success, or None when PSI is unavailable
+    (non-Linux, pre-4.20 kernel, or insufficient privileges).
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import select
+        fd = os.open("/proc/pressure/memory", os.O_RDWR | os.O_NONBLOCK)
+        os.write(fd, PSI_TRIGGER)
+        ep = select.epoll()
+        ep.register(fd, select.EPOLLPRI)
+        return (ep, fd)
+    except OSError:
+        return None
+
+def _idle_wait(psi_watcher, pct, threshold, check_interval):
+    """
+    Wait until the next check is due. Sleeps longer the further usage sits
+    below the threshold, and when a PSI watcher is available the kernel wakes
+    us early on a memory-pressure spike instead of us polling blindly.
+    """
+    gap = threshold - pct
+    timeout = max(1, min(check_interval, int(gap * ADAPTIVE_SLEEP_PER_PCT)))
+    if psi_watcher is not None:
+        psi_watcher[0].poll(timeout)
+    else:
+        time.sleep(timeout)
+
 # ----------------------------- Utility functions ---------------------------
-def current_ram_percent():
-    return psutil.virtual_memory().percent
+def _snapshot():
+    """Take one virtual-memory snapshot. Callers should reuse it rather than
+    re-querying psutil (each query re-reads /proc/meminfo or equivalent)."""
+    return psutil.virtual_memory()
+
+# Physical RAM size never changes while we run; cache it and the
+# percent-conversion factor so per-event math is a multiply, not a
+# fresh virtual_memory() query plus division.
+_TOTAL = psutil.virtual_memory().total
+_INV_TOTAL_PCT = 100.0 / _TOTAL
+
+# On Linux, keep /proc/meminfo open and pread it for the one number the hot
+# loop needs; that skips psutil's full parse + namedtuple construction.
+# MemTotal/MemAvailable sit in the first few lines, well inside 512 bytes.
+_MEMINFO_RE = re.compile(rb"MemTotal:\s+(\d+).*?MemAvailable:\s+(\d+)", re.S)
+_MEMINFO_FD = None
+if sys.platform.startswith("linux"):
+    try:
+        _MEMINFO_FD = os.open("/proc/meminfo", os.O_RDONLY)
+    except OSError:
+        _MEMINFO_FD = None
+
+def current_ram_percent(vm=None):
+    if vm is not None:
+        return vm.percent
+    if _MEMINFO_FD is not None:
+        m = _MEMINFO_RE.search(os.pread(_MEMINFO_FD, 512, 0))
+        if m:
+            total, avail = int(m.group(1)), int(m.group(2))
+            return round(100.0 * (1.0 - avail / total), 1)
+    return _snapshot().percent
+
+def bytes_used(vm=None):
+    return (vm or _snapshot()).used
+
+def _freed_bytes(vm_before, vm_after):
+    """
+    Platform-appropriate measure of how much a cleanup freed. On Linux,
+    evicted page cache shows up as free pages while psutil's 'used'
+    (total - available) barely moves, since cache already counts as
+    available; the Windows working-set trim shows up as a drop in used.
+    """
+    if _SYSTEM == "Linux":
+        return max(0, vm_after.free - vm_before.free)
+    return max(0, vm_before.used - vm_after.used)
+
+class _CachedTimeFormatter(logging.Formatter):
+    """
+    Formatter that re-renders asctime at most once per second. strftime +
+    localtime dominate record formatting; records created within the same
+    second reuse the cached string (milliseconds stay per-record).
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._last_int = None
+        self._last_str = ""
 
-def bytes_used():
-    return psutil.virtual_memory().used
+    def formatTime(self, record, datefmt=None):
+        time_int = int(record.created)
+        if time_int != self._last_int:
+            self._last_int = time_int
+            self._last_str = time.strftime(datefmt or self.default_time_format,
+                                           self.converter(record.created))
+        s = self._last_str
+        if not datefmt and self.default_msec_format:
+            s = self.default_msec_format % (s, record.msecs)
+        return s
 
 # ----------------------------- Main loop ----------------------------------
+def _mk_loop(cleaner, threshold, check_interval, after_clean, logger,
+             psi_watcher, log_status, start_time, executor):
+    """
+    Build the continuous monitoring loop as a closure. Everything the loop
+    touches per tick — psutil helpers, time functions, logger methods, the
+    tuning constants — is bound to a local name here, so the hot path runs
+    on LOAD_FAST lookups instead of module-dict and attribute lookups.
+    """
+    snapshot = _snapshot
+    ram_percent = current_ram_percent
+    idle_wait = _idle_wait
+    freed_fn = _freed_bytes
+    record_event = record_clean_event
+    submit = executor.submit
+    info = logger.info
+    now = time.time
+    monotonic = time.monotonic
+    sleep = time.sleep
+    alpha = BASELINE_EWMA_ALPHA
+    log_delta = LOG_PCT_DELTA
+    freed_floor = _TOTAL * MIN_EFFECTIVE_FREED_FRAC
+    max_cooldown = after_clean * MAX_COOLDOWN_FACTOR
+    log_every = max(1, 60 // check_interval)
+
+    def run():
+        baseline = None      # EWMA of observed usage; cleaning below it is churn
+        cooldown = after_clean
+        cooldown_until = 0.0  # wall-clock time before which we won't re-trigger
+        clean_future = None
+        vm_at_trigger = None
+        next_deadline = monotonic() + check_interval
+        last_logged_pct = None
+        iteration = 0
+        while True:
+            # Cheap percent read per tick (pread of /proc/meminfo on Linux);
+            # full psutil snapshots only around actual cleanups.
+            pct = ram_percent()
+            if baseline is None:
+                baseline = pct
+            else:
+                baseline = alpha * pct + (1 - alpha) * baseline
+            effective_threshold = max(threshold, baseline)
+            # Status line only on meaningful movement or every ~minute; the
+            # %-style args also defer formatting past the level check.
+            iteration += 1
+            if (last_logged_pct is None
+                    or abs(pct - last_logged_pct) >= log_delta
+                    or iteration % log_every == 0):
+                info("Uptime: %ds - RAM usage: %s%% (threshold %d%%)",
+                     int(now() - start_time), pct, threshold)
+                last_logged_pct = pct
+
+            if clean_future is not None and clean_future.done():
+                success = clean_future.result()
+                clean_future = None
+                vm_after = snapshot()
+                log_status(vm_at_trigger, vm_after, success)
+                # Back off exponentially when a clean barely freed anything;
+                # repeated trims just force the pages straight back in.
+                freed = freed_fn(vm_at_trigger, vm_after)
+                record_event(now(), freed)
+                if freed < freed_floor:
+                    cooldown = min(cooldown * 2, max_cooldown)
+                    info(f"Cleanup freed little memory; cooldown backed off to {cooldown}s")
+                else:
+                    cooldown = after_clean
+                cooldown_until = now() + cooldown
+
+            if (pct >= effective_threshold and clean_future is None
+                    and now() >= cooldown_until):
+                info("Threshold exceeded -> attempting cleaning")
+                vm_at_trigger = snapshot()
+                clean_future = submit(cleaner, logger)
+
+            if clean_future is not None or pct >= effective_threshold:
+                # Clean in flight (or cooling down): keep sampling on the
+                # regular cadence. Sleeping toward a monotonic deadline
+                # rather than for a fixed duration keeps the cadence from
+                # drifting by the per-tick work time.
+                sleep(max(0, next_deadline - monotonic()))
+                next_deadline += check_interval
+            else:
+                idle_wait(psi_watcher, pct, threshold, check_interval)
+                next_deadline = monotonic() + check_interval
+
+    return run
+
 def main(argv):
     parser = argparse.ArgumentParser(description="Cross-platform RAM Cleaner Service")
     parser.add_argument("--threshold", "-t", type=int, default=DEFAULT_THRESHOLD,
@@ -131,35 +529,41 @@ def main(argv):
     parser.add_argument("--after-clean", "-a", type=int, default=DEFAULT_AFTER_CLEAN,
                         help=f"Seconds to wait after a cleanup (default: {DEFAULT_AFTER_CLEAN})")
     parser.add_argument("--logfile", "-l", default=DEFAULT_LOGFILE, help="Log file path")
+    parser.add_argument("--stats-port", type=int, default=0,
+                        help="Serve sampled clean-event stats as JSON on this localhost port (0 = off)")
     parser.add_argument("--once", action="store_true", help="Run one check & exit (useful for testing)")
     parser.add_argument("--verbose", action="store_true", help="Print extra output to stdout")
     args = parser.parse_args(argv)
 
-    # Setup logging
-    logging.basicConfig(filename=args.logfile,
-                        level=logging.INFO,
-                        format="%(asctime)s - %(levelname)s - %(message)s")
-    logger = logging.getLogger("ram_cleaner")
+    # Setup logging. Handlers live behind a queue so file (and console) I/O
+    # happens on the listener thread, not in the sampling loop.
+    formatter = _CachedTimeFormatter("%(asctime)s - %(levelname)s - %(message)s")
+    fh = RotatingFileHandler(args.logfile, maxBytes=1_000_000, backupCount=3)
+    fh.setFormatter(formatter)
+    handlers = [fh]
 
     if args.verbose:
         # Add console handler
         ch = logging.StreamHandler(sys.stdout)
         ch.setLevel(logging.INFO)
-        ch.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-        logger.addHandler(ch)
+        ch.setFormatter(formatter)
+        handlers.append(ch)
 
-    system_name = platform.system().lower()
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    logger = logging.getLogger("ram_cleaner")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(QueueHandler(log_queue))
+
+    system_name = _SYSTEM.lower()
     logger.info(f"Starting ram_cleaner on {system_name}. Threshold={args.threshold}%")
 
-    # Identify clean function
-    if system_name == "windows":
-        cleaner = clean_memory_windows
-    elif system_name == "linux":
-        cleaner = clean_memory_linux
-    elif system_name == "darwin":
-        cleaner = clean_memory_mac
-    else:
+    # Clean function was resolved at import
+    cleaner = CLEANER
+    if cleaner is None:
         logger.error(f"Unsupported OS: {system_name}")
+        listener.stop()  # drain the queue so the error reaches the file
         sys.exit(1)
 
     # On Linux/macOS we should warn user if not root (since cleaning usually needs root)
@@ -167,48 +571,46 @@ def main(argv):
         logger.warning("Not running as root — cleaning may fail (needs sudo/root).")
 
     start_time = time.time()
+    if args.stats_port:
+        _start_stats_server(args.stats_port, logger)
+    psi_watcher = _open_psi_watcher()
+    if psi_watcher is not None:
+        logger.info("PSI memory-pressure trigger registered; waits are event-driven")
 
-    def log_status(before, after, success):
-        freed_bytes = max(0, before - after)
-        before_pct = (before / psutil.virtual_memory().total) * 100
-        after_pct = (after / psutil.virtual_memory().total) * 100
-        logger.info(f"RAM bytes before: {before} | after: {after} | freed: {freed_bytes} | success: {success}")
+    def log_status(vm_before, vm_after, success):
+        freed_bytes = _freed_bytes(vm_before, vm_after)
+        after_pct = vm_after.used * _INV_TOTAL_PCT
+        logger.info(f"RAM bytes before: {vm_before.used} | after: {vm_after.used} | freed: {freed_bytes} | success: {success}")
         # extra human-friendly line
-        logger.info(f"RAM percent before: {psutil.virtual_memory().percent}% (after: {after_pct:.1f}%)")
+        logger.info(f"RAM percent before: {vm_before.percent}% (after: {after_pct:.1f}%)")
 
     # Single-run mode
     if args.once:
-        ram_before = bytes_used()
-        pct_before = current_ram_percent()
-        logger.info(f"Single-run test: RAM {pct_before}% before")
+        vm_before = _snapshot()
+        logger.info(f"Single-run test: RAM {vm_before.percent}% before")
         success = cleaner(logger)
         time.sleep(1)  # short wait for system to settle
-        ram_after = bytes_used()
-        pct_after = current_ram_percent()
-        log_status(ram_before, ram_after, success)
+        vm_after = _snapshot()
+        log_status(vm_before, vm_after, success)
+        listener.stop()
         return 0
 
-    # Continuous mode
+    # Continuous mode. Cleaning runs on a single-worker executor so a slow
+    # sync/purge never blocks sampling or Ctrl-C handling on the main thread;
+    # the loop itself is generated with its hot names pre-bound.
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cleaner")
+    loop = _mk_loop(cleaner, args.threshold, args.check_interval,
+                    args.after_clean, logger, psi_watcher, log_status,
+                    start_time, executor)
     try:
-        while True:
-            pct = current_ram_percent()
-            uptime = int(time.time() - start_time)
-            logger.info(f"Uptime: {uptime}s - RAM usage: {pct}% (threshold {args.threshold}%)")
-            if pct >= args.threshold:
-                logger.info("Threshold exceeded -> attempting cleaning")
-                before_bytes = bytes_used()
-                success = cleaner(logger)
-                time.sleep(1)  # small settle pause
-                after_bytes = bytes_used()
-                log_status(before_bytes, after_bytes, success)
-                # cooldown
-                time.sleep(args.after_clean)
-            else:
-                time.sleep(args.check_interval)
+        loop()
     except KeyboardInterrupt:
         logger.info("ram_cleaner interrupted by user (KeyboardInterrupt)")
     except Exception:
         logger.exception("ram_cleaner crashed")
+    finally:
+        executor.shutdown(wait=False)
+        listener.stop()
     return 0
 
 if __name__ == "__main__":